@@ -5,19 +5,31 @@
 
 import os
 import json
+import hashlib
+import heapq
 import io
 import re
+import tempfile
 import csv
 import time
-from datetime import datetime, timedelta
+import threading
+from datetime import date, datetime, timedelta
 from collections import Counter
+from functools import lru_cache
+from itertools import chain, islice
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import lxml.html
+from lxml import etree
 
 # firebase imports
 import firebase_admin
 from firebase_admin import credentials, firestore
+from google.api_core.exceptions import Aborted, DeadlineExceeded
 
 # ------------ Config ------------
 # Browser-like default headers (modern Chrome UA). These help avoid 403s on the API.
@@ -40,6 +52,19 @@ DAYS_BACK = int(os.environ.get("DAYS_BACK", "60"))
 REQUEST_TIMEOUT = int(os.environ.get("REQUEST_TIMEOUT", "15"))
 CSV_FETCH_RETRIES = int(os.environ.get("CSV_FETCH_RETRIES", "3"))
 CSV_FETCH_BACKOFF = float(os.environ.get("CSV_FETCH_BACKOFF", "0.6"))
+# lotteries processed concurrently by run_and_save
+MAX_WORKERS = int(os.environ.get("MAX_WORKERS", "10"))
+# Firestore WriteBatch hard limit (operations per commit)
+FIRESTORE_BATCH_LIMIT = 500
+# base delay (seconds) before retrying a failed batch commit; doubles per attempt
+FIRESTORE_BACKOFF = float(os.environ.get("FIRESTORE_BACKOFF", "0.6"))
+# LotteryGuru history pages fetched concurrently, and the minimum spacing (seconds)
+# between request starts so the site still sees at most ~4 requests/second
+LOTTERYGURU_WORKERS = int(os.environ.get("LOTTERYGURU_WORKERS", "4"))
+LOTTERYGURU_MIN_INTERVAL = float(os.environ.get("LOTTERYGURU_MIN_INTERVAL", "0.25"))
+LOTTERYGURU_PAGE_CAP = 50
+# on-disk store for conditional GETs (ETag / Last-Modified); empty string disables it
+HTTP_CACHE_DIR = os.environ.get("HTTP_CACHE_DIR", ".http_cache")
 
 # Map page ids to National Lottery API game IDs (per user's provided links)
 API_GAME_ID = {
@@ -148,107 +173,476 @@ HOT_TOP_N = {
     "australia_powerball": {"top_main": 10, "top_bonus": 10},
 }
 
+# strptime formats tried by try_parse_date_any, most common first per source.
+# '%d/%m/%Y' and '%m/%d/%Y' accept the same strings, so their relative order decides ambiguous dates.
+_DEFAULT_DATE_FMTS = (
+    "%d %b %Y", "%d %B %Y", "%d/%m/%Y", "%Y-%m-%d",
+    "%m/%d/%Y", "%Y/%m/%d", "%d-%m-%Y",
+    "%b %d, %Y", "%B %d, %Y",
+    "%a %d %b %Y", "%A %d %B %Y",
+    "%a, %b %d, %Y", "%A, %B %d, %Y"
+)
+# National Lottery API CSVs use '10-Oct-2025'
+_UK_DATE_FMTS = ("%d-%b-%Y",) + _DEFAULT_DATE_FMTS
+# US sites are month-first
+_US_DATE_FMTS = ("%m/%d/%Y",) + tuple(f for f in _DEFAULT_DATE_FMTS if f != "%m/%d/%Y")
+
+_FMT_ORDER_BY_PAGE = {
+    "euromillions": _UK_DATE_FMTS,
+    "lotto": _UK_DATE_FMTS,
+    "thunderball": _UK_DATE_FMTS,
+    "set-for-life": _UK_DATE_FMTS,
+    "lotto-hotpicks": _UK_DATE_FMTS,
+    "euromillions-hotpicks": _UK_DATE_FMTS,
+    "megamillions": _US_DATE_FMTS,
+    "powerball": _US_DATE_FMTS,
+    "sa_lotto": ("%d.%m.%Y",) + _DEFAULT_DATE_FMTS,
+}
+
+# English month names as strptime's %b / %B accept them (case-insensitive)
+_MONTH_ABBR = {m: i for i, m in enumerate(
+    ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), 1)}
+_MONTH_FULL = {m: i for i, m in enumerate(
+    ("january", "february", "march", "april", "may", "june", "july",
+     "august", "september", "october", "november", "december"), 1)}
+
+# ------------ Regex patterns (compiled once, used per row/element) ------------
+# date parsing
+# fast path for try_parse_date_any: the plain numeric / day-month-year shapes, one fullmatch
+_DATE_FAST_RE = re.compile(
+    r'(?P<iy>\d{4})-(?P<im>\d{1,2})-(?P<id>\d{1,2})'
+    r'|(?P<sa>\d{1,2})/(?P<sb>\d{1,2})/(?P<sy>\d{4})'
+    r'|(?P<dd>\d{1,2})\.(?P<dm>\d{1,2})\.(?P<dy>\d{4})'
+    r'|(?P<hd>\d{1,2})-(?P<hmon>[A-Za-z]{3})-(?P<hy>\d{4})'
+    r'|(?P<wd>\d{1,2})\s+(?P<wmon>[A-Za-z]+)\s+(?P<wy>\d{4})'
+)
+_DRAW_PREFIX_RE = re.compile(r'(?i)draw date[:\s]*')
+_DATE_SLASH_RE = re.compile(r'(\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4})')
+_DATE_SEP_RE = re.compile(r'(\d{1,2}[\/\.\-]\d{1,2}[\/\.\-]\d{2,4})')
+_DATE_MONTHNAME_RE = re.compile(r'([A-Za-z]{3,9}\s+\d{1,2},\s*\d{4})')
+_DATE_DMONY_RE = re.compile(r'(\d{1,2}-[A-Za-z]{3}-\d{4})')
+_DATE_DOT_RE = re.compile(r'(\d{1,2}\.\d{1,2}\.\d{4})')
+_DATE_DOT_FULL_RE = re.compile(r'^(\d{1,2})\.(\d{1,2})\.(\d{4})$')
+
+# HTML fallback
+# one sweep per element: a date-like substring, or a standalone 1-2 digit ball (dispatch on lastgroup)
+_HTML_ROW_TOKEN_RE = re.compile(
+    r'(?P<date>\d{1,2}\s+\w{3,9}\s+\d{4}|\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4}|\w+\s+\d{1,2},\s*\d{4})'
+    r'|(?P<ball>\b\d{1,2}\b)'
+)
+# start of an HTML document (a CSV URL that answered with a login/error page)
+_HTML_DOC_RE = re.compile(r'\ufeff?\s*<(?:!doctype\s+html|html)\b', re.I)
+_DATE_LABEL_RE = re.compile(r'date[:\s]*([^\|\,\-]{6,40})', re.I)
+# LotteryGuru line fallback: "02 Oct 2025" or a numeric d/m/y
+_LG_DATE_RE = re.compile(r'(\d{1,2}\s+[A-Za-z]{3,9}\s+\d{4}|\d{1,2}[\/\.\-]\d{1,2}[\/\.\-]\d{2,4})')
+
+# numbers / CSV cells
+_DIGITS_1_2_RE = re.compile(r'\d{1,2}')
+_DIGITS_1_3_RE = re.compile(r'\d{1,3}')
+_BALL_RE = re.compile(r'\b(\d{1,2})\b')  # strict ball extraction (word-boundary 1-2 digits)
+_BALL_ONE_RE = re.compile(r'\bball\s*1\b')
+_BALL_N_RE = re.compile(r'\bball\s*(\d+)\b')
+_WINNUM_RE = re.compile(r'winning\s*number\s*(\d+)')
+_LONG_DIGIT_RE = re.compile(r'\d{6,}')
+_ALL_DIGITS_RE = re.compile(r'^\d+$')
+_GAME_NAME_STRIP_RE = re.compile(r'[\s\-_]')
+
+# row splitting
+_WHITESPACE_RE = re.compile(r'\s+')
+_FIELD_SPLIT_RE = re.compile(r'[\t,; ]+')
+_ROW_SPLIT_RE = re.compile(r'[\t,]+|\s{2,}|\s+')
+# SA lotto fast path: 'drawno<sep>dd.mm.YYYY<sep>n1<sep>n2...' in one fullmatch.
+# <sep> is exactly one _ROW_SPLIT_RE separator (tab/comma run, or a whitespace run
+# not starting with a tab), so lines that would split into empty tokens fall through.
+_SA_SEP = r'(?:[\t,]+|[^\S\t]\s*)'
+_SA_LINE_RE = re.compile(r'[^\s,]+' + _SA_SEP + r'(\d{1,2}\.\d{1,2}\.\d{4})((?:' + _SA_SEP + r'\d+)+)')
+# first 1-3 digits of each digit run (what int(token[:3]) would give)
+_SA_NUM_RE = re.compile(r'(?<!\d)\d{1,3}')
+
+# ------------ HTTP session ------------
+# One keep-alive connection pool shared by every fetch (and every worker thread),
+# so repeat hits on the same host skip the TCP/TLS handshake.
+# Transient statuses are retried inside urllib3 on the same pooled connection;
+# raise_on_status=False hands the last response back so raise_for_status() still
+# reports it as an HTTPError to the callers' own retry/fallback logic.
+_RETRY_STATUSES = (429, 500, 502, 503, 504)
+_ADAPTER = HTTPAdapter(pool_connections=16, pool_maxsize=32,
+                       max_retries=Retry(total=2, backoff_factor=0.3,
+                                         status_forcelist=_RETRY_STATUSES,
+                                         raise_on_status=False))
+_SESSION = requests.Session()
+_SESSION.headers.update(HEADERS)
+_SESSION.mount("https://", _ADAPTER)
+_SESSION.mount("http://", _ADAPTER)
+
+# fetch_csv moves on to the next URL variant without re-trying these
+_DEAD_URL_STATUSES = frozenset((400, 404, 405, 410))
+
+# per-host politeness: earliest monotonic time the next request may start
+_HOST_NEXT_START = {}
+_HOST_THROTTLE_LOCK = threading.Lock()
+
+
+def _throttle_host(url, min_interval):
+    """
+    Block until a request to url's host may start, keeping starts to the same
+    host at least min_interval apart. Other hosts are never held up.
+    """
+    host = urlsplit(url).netloc
+    with _HOST_THROTTLE_LOCK:
+        now = time.monotonic()
+        start = max(now, _HOST_NEXT_START.get(host, 0.0))
+        # reserve the slot, then sleep outside the lock
+        _HOST_NEXT_START[host] = start + min_interval
+    if start > now:
+        time.sleep(start - now)
+
+# ------------ Conditional GET cache ------------
+# Bodies of previously fetched pages/CSVs are kept on disk with their ETag /
+# Last-Modified; the next run revalidates with If-None-Match / If-Modified-Since
+# and a 304 reuses the stored body instead of downloading it again.
+def _http_cache_paths(url):
+    key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    return os.path.join(HTTP_CACHE_DIR, key + ".body"), os.path.join(HTTP_CACHE_DIR, key + ".meta")
+
+
+def _conditional_headers(url):
+    """
+    If-None-Match / If-Modified-Since for url, or {} when nothing usable is cached.
+    """
+    if not HTTP_CACHE_DIR:
+        return {}
+    body_path, meta_path = _http_cache_paths(url)
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not os.path.exists(body_path):
+        return {}
+    hdrs = {}
+    if meta.get("etag"):
+        hdrs["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        hdrs["If-Modified-Since"] = meta["last_modified"]
+    return hdrs
+
+
+def _read_http_cache(url):
+    body_path, _ = _http_cache_paths(url)
+    with open(body_path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _iter_http_cache_lines(url):
+    """
+    Cached body for url one line at a time (line endings stripped), read lazily.
+    """
+    body_path, _ = _http_cache_paths(url)
+    with open(body_path, "r", encoding="utf-8") as f:
+        for line in f:
+            yield line.rstrip("\n")
+
+
+def _cache_validators(response):
+    """
+    (etag, last_modified) when response can be cached, else None.
+    """
+    if not HTTP_CACHE_DIR:
+        return None
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if not (etag or last_modified):
+        return None
+    return etag, last_modified
+
+
+def _commit_http_cache(url, body_tmp, validators):
+    """
+    Move a fully written body temp file into place, then record its validators.
+    """
+    body_path, meta_path = _http_cache_paths(url)
+    etag, last_modified = validators
+    # write-then-rename so a concurrent reader never sees a half-written file
+    os.replace(body_tmp, body_path)
+    tmp = f"{meta_path}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"url": url, "etag": etag, "last_modified": last_modified,
+                            "fetched_at": time.time()}))
+    os.replace(tmp, meta_path)
+
+
+def _write_http_cache(url, response, text, log=print):
+    """
+    Store text for url when the response carries a validator; failures are non-fatal.
+    """
+    validators = _cache_validators(response)
+    if validators is None:
+        return
+    body_path, _ = _http_cache_paths(url)
+    tmp = f"{body_path}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(HTTP_CACHE_DIR, exist_ok=True)
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        _commit_http_cache(url, tmp, validators)
+    except OSError as e:
+        log(f"[warning] could not write HTTP cache for {url}: {e}")
+
+
+def _tee_http_cache(url, response, lines, log=print):
+    """
+    Yield streamed lines unchanged while writing them to a temp file beside
+    url's cached body; the temp file replaces the cached body only once the
+    stream is used up. Without a validator lines just pass through.
+    """
+    validators = _cache_validators(response)
+    if validators is None:
+        yield from lines
+        return
+    body_path, _ = _http_cache_paths(url)
+    tmp = f"{body_path}.{threading.get_ident()}.tmp"
+    f = None
+    try:
+        os.makedirs(HTTP_CACHE_DIR, exist_ok=True)
+        f = open(tmp, "w", encoding="utf-8")
+    except OSError as e:
+        log(f"[warning] could not write HTTP cache for {url}: {e}")
+    complete = False
+    try:
+        sep = ""
+        for line in lines:
+            if f is not None:
+                try:
+                    # same bytes on disk as "\n".join(lines), one line at a time
+                    f.write(sep + line)
+                except OSError as e:
+                    log(f"[warning] could not write HTTP cache for {url}: {e}")
+                    f.close()
+                    f = None
+                    try:
+                        os.remove(tmp)
+                    except OSError:
+                        pass
+                sep = "\n"
+            yield line
+        complete = True
+    finally:
+        # an abandoned or failed stream leaves the previously cached body untouched
+        if f is not None:
+            f.close()
+            try:
+                if complete:
+                    _commit_http_cache(url, tmp, validators)
+                else:
+                    os.remove(tmp)
+            except OSError as e:
+                log(f"[warning] could not write HTTP cache for {url}: {e}")
+
+
 # ------------ Helpers ------------
-def fetch_url(url, headers=None, session=None, timeout=REQUEST_TIMEOUT):
+def fetch_url(url, headers=None, session=None, timeout=REQUEST_TIMEOUT, log=print):
     if session is None:
-        session = requests.Session()
-    hdrs = headers or HEADERS
+        session = _SESSION
+    hdrs = dict(headers or HEADERS)
+    hdrs.update(_conditional_headers(url))
     r = session.get(url, headers=hdrs, timeout=timeout, allow_redirects=True)
+    if r.status_code == 304:
+        log(f"[debug] not modified, using cached body: {url}")
+        return _read_http_cache(url)
     r.raise_for_status()
+    _write_http_cache(url, r, r.text, log=log)
     return r.text
 
 
-def fetch_soup(url, session=None):
-    txt = fetch_url(url, session=session)
-    return BeautifulSoup(txt, "html.parser")
+# ------------ lxml helpers ------------
+# HTML scrapers query lxml trees with precompiled XPaths (evaluated in libxml2)
+def _xp_class(cls):
+    # exact class-token test, same as the CSS ".cls" selector
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')"
+
+
+# visible text only (bs4's get_text skips <script>/<style> contents)
+_XP_TEXT = etree.XPath(".//text()[not(ancestor::script or ancestor::style)]")
+
+
+def _el_text(el):
+    """
+    lxml equivalent of bs4's el.get_text(" ", strip=True).
+    """
+    return " ".join(t.strip() for t in _XP_TEXT(el) if t.strip())
+
+
+def _html_root(html):
+    """
+    lxml root element for an HTML string, or None when there is no markup.
+    """
+    if not html or not html.strip():
+        return None
+    try:
+        try:
+            return lxml.html.fromstring(html)
+        except ValueError:
+            # str input with an XML encoding declaration must be handed over as bytes
+            return lxml.html.fromstring(html.encode("utf-8"))
+    except etree.ParserError:
+        # "Document is empty": only a comment, an <?xml ...?> line, no elements at all
+        return None
+
+
+# scrape_html: National Lottery draw-history rows, and the generic li/tr fallback
+_XP_DRAW_HISTORY_ULS = etree.XPath(f"//*[@id=$container_id]//ul[{_xp_class('list_table_presentation')}]")
+_XP_TABLE_CELLS = etree.XPath(f".//span[{_xp_class('table_cell_block')}]")
+_XP_LIST_ROWS = etree.XPath("//li | //tr")
 
 
 def extract_numbers_from_span(text):
-    nums = re.findall(r'\d{1,2}', text)
+    nums = _DIGITS_1_2_RE.findall(text)
     return [int(n) for n in nums]
 
 
-def try_parse_date_any(text):
+def try_parse_date_any(text, page_id=None):
+    """
+    Parse a date out of free text. page_id selects the strptime format order
+    (_FMT_ORDER_BY_PAGE) so each source's usual format is tried first.
+    """
     text = (text or "").strip()
     if not text:
         return None
-    text = re.sub(r'(?i)draw date[:\s]*', '', text).strip()
-
-    fmts = (
-        "%d %b %Y", "%d %B %Y", "%d/%m/%Y", "%Y-%m-%d",
-        "%m/%d/%Y", "%Y/%m/%d", "%d-%m-%Y",
-        "%b %d, %Y", "%B %d, %Y",
-        "%a %d %b %Y", "%A %d %B %Y",
-        "%a, %b %d, %Y", "%A, %B %d, %Y"
-    )
+    return _try_parse_date_cached(text, page_id)
+
+
+@lru_cache(maxsize=4096)
+def _try_parse_date_cached(text, page_id):
+    """
+    Cached body of try_parse_date_any (text is already stripped and non-empty).
+    Date strings repeat across rows, pages and fallback passes, so memoizing
+    skips the strptime format scan for anything seen before.
+    """
+    text = _DRAW_PREFIX_RE.sub('', text).strip()
+    fmts = _FMT_ORDER_BY_PAGE.get(page_id, _DEFAULT_DATE_FMTS)
+
+    date_obj = _fast_parse_date(text, fmts)
+    if date_obj:
+        return date_obj
+
     for fmt in fmts:
         try:
             return datetime.strptime(text, fmt).date()
-        except Exception:
+        except ValueError:
             pass
 
     # try to find a date fragment inside the string
-    m = re.search(r'(\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4})', text)
+    m = _DATE_SLASH_RE.search(text)
     if m:
         for fmt in ("%m/%d/%Y", "%d/%m/%Y", "%d-%m-%Y", "%Y-%m-%d"):
             try:
                 return datetime.strptime(m.group(1), fmt).date()
-            except Exception:
+            except ValueError:
                 pass
 
     # try "MonthName day, year" inside text
-    m2 = re.search(r'([A-Za-z]{3,9}\s+\d{1,2},\s*\d{4})', text)
+    m2 = _DATE_MONTHNAME_RE.search(text)
     if m2:
         for fmt in ("%b %d, %Y", "%B %d, %Y"):
             try:
                 return datetime.strptime(m2.group(1), fmt).date()
-            except Exception:
+            except ValueError:
                 pass
 
     # handle dd-Mon-YYYY style like '27-Jan-2026'
-    m3 = re.search(r'(\d{1,2}-[A-Za-z]{3}-\d{4})', text)
+    m3 = _DATE_DMONY_RE.search(text)
     if m3:
         try:
             return datetime.strptime(m3.group(1), "%d-%b-%Y").date()
-        except Exception:
+        except ValueError:
             pass
 
     return None
 
 
-def _enforce_ranges(mains, bonus, page_id=None):
+def _parse_dotted_date(text):
     """
-    Filter mains/bonus by GAME_RANGES for page_id (module-level).
-    Returns filtered (mains, bonus).
+    'dd.mm.YYYY' -> date by splitting the fixed format directly (no strptime
+    format interpreter). None when text isn't exactly that shape or not a real date.
     """
-    ranges = GAME_RANGES.get(page_id) or {}
+    m = _DATE_DOT_FULL_RE.match(text)
+    if not m:
+        return None
+    try:
+        return date(int(m.group(3)), int(m.group(2)), int(m.group(1)))
+    except ValueError:
+        return None
+
+
+def _fast_parse_date(text, fmts):
+    """
+    Build the date straight from one _DATE_FAST_RE match, giving exactly what
+    the first succeeding format in fmts would. Returns None when the shape isn't
+    covered or the fields aren't a real date; the strptime loop then decides.
+    """
+    m = _DATE_FAST_RE.fullmatch(text)
+    if not m:
+        return None
+    try:
+        if m.group("iy"):
+            return date(int(m.group("iy")), int(m.group("im")), int(m.group("id")))
+        if m.group("sy"):
+            # ambiguous a/b/YYYY: day-first or month-first per the page's format order
+            a, b, y = int(m.group("sa")), int(m.group("sb")), int(m.group("sy"))
+            for fmt in fmts:
+                if fmt == "%d/%m/%Y" and 1 <= a <= 31 and 1 <= b <= 12:
+                    return date(y, b, a)
+                if fmt == "%m/%d/%Y" and 1 <= a <= 12 and 1 <= b <= 31:
+                    return date(y, a, b)
+            return None
+        if m.group("dy"):
+            return _parse_dotted_date(text) if "%d.%m.%Y" in fmts else None
+        if m.group("hy"):
+            month = _MONTH_ABBR.get(m.group("hmon").lower())
+            return date(int(m.group("hy")), month, int(m.group("hd"))) if month else None
+        mon = m.group("wmon").lower()
+        month = _MONTH_ABBR.get(mon) or _MONTH_FULL.get(mon)
+        return date(int(m.group("wy")), month, int(m.group("wd"))) if month else None
+    except ValueError:
+        return None
+
+
+# no GAME_RANGES entry: only the n >= 1 floor applies
+_NO_LIMITS = (float("inf"), float("inf"))
+
+
+def _range_limits(page_id=None):
+    """
+    (main_max, bonus_max) from GAME_RANGES for page_id; unbounded above when the
+    page has no entry. Constant per file, so parsers look it up once.
+    """
+    ranges = GAME_RANGES.get(page_id)
     if not ranges:
-        return mains, bonus
-    main_max = ranges.get("main_max", 9999)
-    bonus_max = ranges.get("bonus_max", 9999)
-    mains = [n for n in mains if isinstance(n, int) and 1 <= n <= main_max]
-    bonus = [n for n in bonus if isinstance(n, int) and 1 <= n <= bonus_max]
-    return mains, bonus
+        return _NO_LIMITS
+    return ranges.get("main_max", 9999), ranges.get("bonus_max", 9999)
 
 
-def _normalize_and_append(draws_list, date_obj, mains, bonus, page_id=None):
+def _normalize_and_append(draws_list, date_obj, mains, bonus, page_id=None, limits=None):
     """
     Normalize mains/bonus, enforce ranges for page_id, and append a draw dict
     onto draws_list (explicit list arg so this works in any scope).
+    limits is a precomputed _range_limits(page_id) for per-row callers.
     """
     if isinstance(mains, int):
         mains = [mains]
     if isinstance(bonus, int):
         bonus = [bonus]
 
-    mains = [int(n) for n in mains if isinstance(n, int) and n >= 1]
-    bonus = [int(n) for n in bonus if isinstance(n, int) and n >= 1]
+    # coerce + range-check in one pass per list
+    main_max, bonus_max = limits or _range_limits(page_id)
+    mains = [int(n) for n in mains if isinstance(n, int) and 1 <= n <= main_max]
+    bonus = [int(n) for n in bonus if isinstance(n, int) and 1 <= n <= bonus_max]
 
-    mains, bonus = _enforce_ranges(mains, bonus, page_id)
     draws_list.append({"date": date_obj.isoformat(), "main": mains, "bonus": bonus})
 
 
-def scrape_html(draw_cfg):
+def scrape_html(draw_cfg, log=print):
     """
     More resilient HTML scraping fallback:
     - Try the original selector
@@ -257,61 +651,62 @@ def scrape_html(draw_cfg):
     url = draw_cfg.get("html_url")
     if not url:
         return []
-    print(f"[debug] Scrape HTML: {url}")
-    soup = fetch_soup(url)
+    log(f"[debug] Scrape HTML: {url}")
+    html = fetch_url(url, log=log)
+    root = _html_root(html)
+    # page config is per call, not per row
+    pid = draw_cfg.get("page_id")
+    spec = GAME_SPECS.get(pid) if pid else None
+    limits = _range_limits(pid)
 
-    # 1) original specific selector attempt
-    selector = f"#draw_history_{draw_cfg.get('page_id')} ul.list_table_presentation"
-    entries = soup.select(selector)
+    # 1) original specific selector attempt: #draw_history_<page_id> ul.list_table_presentation
+    container_id = f"draw_history_{pid}"
+    entries = _XP_DRAW_HISTORY_ULS(root, container_id=container_id) if root is not None else []
     draws = []
     if entries:
         for ul in entries:
-            spans = ul.select("span.table_cell_block")
+            spans = _XP_TABLE_CELLS(ul)
             if len(spans) >= 3:
-                date_txt = spans[0].get_text(" ", strip=True)
-                main_txt = spans[2].get_text(" ", strip=True) if len(spans) >= 3 else ""
-                bonus_txt = spans[3].get_text(" ", strip=True) if len(spans) >= 4 else ""
-                date_obj = try_parse_date_any(date_txt)
+                date_txt = _el_text(spans[0])
+                main_txt = _el_text(spans[2]) if len(spans) >= 3 else ""
+                bonus_txt = _el_text(spans[3]) if len(spans) >= 4 else ""
+                date_obj = try_parse_date_any(date_txt, page_id=pid)
                 if date_obj is None:
                     continue
                 mains = extract_numbers_from_span(main_txt)
                 bonuses = extract_numbers_from_span(bonus_txt)
-                _normalize_and_append(draws, date_obj, mains, bonuses, page_id=draw_cfg.get("page_id"))
+                _normalize_and_append(draws, date_obj, mains, bonuses, limits=limits)
         if draws:
             return draws
 
     # 2) generic fallback: find any list/table rows that contain a date and some numbers
-    candidates = soup.find_all(['li', 'tr', 'div'])
+    candidates = _XP_LIST_ROWS(root) if root is not None else []
     for el in candidates:
-        text = el.get_text(" ", strip=True)
-        if not text:
+        text = _el_text(el)
+        # too short to hold a date ("1/2/25") plus three numbers
+        if len(text) < 12:
             continue
+        # single pass: first date-like substring + every ball number outside dates
+        date_match = None
+        nums = []
+        for tm in _HTML_ROW_TOKEN_RE.finditer(text):
+            if tm.lastgroup == "ball":
+                nums.append(int(tm.group("ball")))
+            elif date_match is None:
+                date_match = tm.group("date")
         # require at least 3 numbers and a date-like substring
-        if len(re.findall(r'\d{1,2}', text)) < 3:
+        if len(nums) < 3:
             continue
-        # try to parse date substring
-        date_match = None
-        m = re.search(r'(\d{1,2}\s+\w{3,9}\s+\d{4}|\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4}|\w+\s+\d{1,2},\s*\d{4})', text)
-        if m:
-            date_match = m.group(1)
         if not date_match:
-            m2 = re.search(r'date[:\s]*([^\|\,\-]{6,40})', text, re.I)
+            m2 = _DATE_LABEL_RE.search(text)
             if m2:
                 date_match = m2.group(1)
         if not date_match:
             continue
-        date_obj = try_parse_date_any(date_match)
+        date_obj = try_parse_date_any(date_match, page_id=pid)
         if not date_obj:
             continue
 
-        # extract numeric tokens (allow up to 3 digits in tokenization)
-        nums = [int(x) for x in re.findall(r'\d{1,3}', text)]
-        # remove any stray year tokens (simple heuristic)
-        nums = [n for n in nums if n != date_obj.year]
-
-        pid = draw_cfg.get("page_id")
-        spec = GAME_SPECS.get(pid) if pid else None
-
         if spec:
             main_count = spec.get("main", 5)
             bonus_count = spec.get("bonus", 0)
@@ -321,310 +716,322 @@ def scrape_html(draw_cfg):
             mains = nums[:5]
             bonus = nums[5:8]
 
-        _normalize_and_append(draws, date_obj, mains, bonus, page_id=pid)
+        _normalize_and_append(draws, date_obj, mains, bonus, limits=limits)
 
-    print(f"[debug] scrape_html parsed draws: {len(draws)}")
+    log(f"[debug] scrape_html parsed draws: {len(draws)}")
     return draws
 
 
-def parse_csv_text(csv_text, page_id=None):
+def _row_dict(row, fieldnames):
     """
-    Robust CSV parser with added support for 'DrawDate,Ball 1,Ball 2,...' style headers
-    (National Lottery API CSV format). Keeps existing fallbacks for other CSV shapes.
-    Returns list of {"date": ISOdate, "main": [...], "bonus": [...]}
+    csv.DictReader view of one tokenized row: extra cells under key None,
+    missing cells set to None.
     """
-    if not csv_text:
-        return []
+    d = dict(zip(fieldnames, row))
+    n_fields, n_cells = len(fieldnames), len(row)
+    if n_fields < n_cells:
+        d[None] = row[n_fields:]
+    elif n_fields > n_cells:
+        for key in fieldnames[n_cells:]:
+            d[key] = None
+    return d
 
-    csv_text = csv_text.lstrip('\ufeff\ufeff')
-    lines = [ln for ln in csv_text.splitlines() if ln.strip()]
-    sample = "\n".join(lines[:40]) if lines else csv_text[:4096]
 
-    # --- delimiter detection similar to before ---
-    first_line = lines[0] if lines else ""
-    candidate_delims = [",", "\t", ";"]
-    chosen_delim = None
-    for delim in candidate_delims:
-        parts = [p.strip().lower() for p in first_line.split(delim)]
-        if any(("winning number" in p or "powerball" in p or "draw date" in p or "draw number" in p or p == "draw") for p in parts):
-            chosen_delim = delim
-            break
-    if not chosen_delim:
-        try:
-            sniffer = csv.Sniffer()
-            dialect = sniffer.sniff(sample)
-            chosen_delim = dialect.delimiter
-        except Exception:
-            chosen_delim = "\t" if "\t" in sample else ","
-
-    delimiter = chosen_delim
-
-    # strict ball-extraction regex (word-boundary 1-2 digits)
-    ball_re = re.compile(r'\b(\d{1,2})\b')
+def _cell_ball(v):
+    """
+    The _BALL_RE number in one stripped CSV cell, or None.
+    """
+    # bare digit cells (nearly all of them) skip the regex: a whole-cell
+    # decimal matches iff it is 1-2 digits long
+    if v.isdecimal():
+        return int(v) if len(v) <= 2 else None
+    m = _BALL_RE.search(v)
+    return int(m.group(1)) if m else None
+
+
+def _col_index(fieldnames):
+    # header name -> cell index; the last duplicate wins, as in a DictReader row
+    return {fn: i for i, fn in enumerate(fieldnames)}
+
+
+def _has_ball_header(fn_list):
+    for fn in fn_list:
+        if _BALL_ONE_RE.search(fn):
+            return True
+    return False
+
+
+def _find_date_field(fn_list):
+    # prefer exact draw/date labels
+    for fn in fn_list:
+        if fn and ('drawdate' in fn.replace(" ", "") or 'draw date' in fn or 'draw' == fn.strip() or 'date' in fn):
+            return fn
+    # fallback for languages (e.g., 'fecha')
+    for fn in fn_list:
+        if fn and ('fecha' in fn):
+            return fn
+    # last resort: any field that contains 'date'
+    for fn in fn_list:
+        if fn and 'date' in fn:
+            return fn
+    return None
 
-    draws = []
 
-    # Try DictReader first (clean headered CSVs)
-    f = io.StringIO(csv_text)
-    reader = csv.DictReader(f, delimiter=delimiter)
-    fieldnames = reader.fieldnames or []
+def _parse_ball_header_style(rows, page_id=None):
+    """
+    'DrawDate,Ball 1,Ball 2,...' style CSVs (National Lottery API format).
+    Returns [] unless the header has a Draw/Date column and at least "ball 1".
+    """
+    rows = iter(rows)
+    fieldnames = next(rows, None) or []
     fn_lower = [ (fn or "").lower() for fn in fieldnames ]
+    if not (fieldnames and _has_ball_header(fn_lower) and _find_date_field(fn_lower)):
+        return []
 
-    # --------- NEW: Explicit support for 'Ball 1','Ball 2',... + 'DrawDate' style CSVs ----------
-    # Detect if headers include a Draw/Date column and at least "ball 1"
-    def has_ball_header(fn_list):
-        for fn in fn_list:
-            if re.search(r'\bball\s*1\b', fn) or re.search(r'\bball1\b', fn):
-                return True
-        return False
-
-    def find_date_field(fn_list):
-        # prefer exact draw/date labels
-        for fn in fn_list:
-            if fn and ('drawdate' in fn.replace(" ", "") or 'draw date' in fn or 'draw' == fn.strip() or 'date' in fn):
-                return fn
-        # fallback for languages (e.g., 'fecha')
-        for fn in fn_list:
-            if fn and ('fecha' in fn):
-                return fn
-        # last resort: any field that contains 'date'
-        for fn in fn_list:
-            if fn and 'date' in fn:
-                return fn
-        return None
-
-    if fieldnames and has_ball_header(fn_lower) and find_date_field(fn_lower):
-        # We'll parse by column names: collect Ball 1..N and bonus-like columns
-        # Build an ordered map of original fieldname -> lowercased
-        fld_map = {fn: (fn or "").lower() for fn in fieldnames}
+    draws = []
+    limits = _range_limits(page_id)
+    # We'll parse by column names: collect Ball 1..N and bonus-like columns
+    # Build an ordered map of original fieldname -> lowercased
+    fld_map = {fn: (fn or "").lower() for fn in fieldnames}
+
+    # find date column name (original form)
+    date_col = None
+    for orig, low in fld_map.items():
+        if 'drawdate' in low.replace(" ", "") or 'draw date' in low or low.strip() == 'draw' or 'date' == low or 'fecha' in low:
+            date_col = orig
+            break
+    # fallback to the first column if needed
+    if not date_col and fieldnames:
+        date_col = fieldnames[0]
+
+    # build ball column list in order by index: look for 'ball 1', 'ball 2', etc.
+    ball_by_idx = {}
+    for orig, low in fld_map.items():
+        for bm in _BALL_N_RE.finditer(low):
+            ball_by_idx.setdefault(bm.group(1), orig)
+    ball_cols = []
+    for n in range(1, 15):  # up to 14 just in case; will break when not found
+        found = ball_by_idx.get(str(n))
+        if found:
+            ball_cols.append(found)
+        else:
+            # stop scanning when a consecutive index missing (but still keep previously found)
+            # However, sometimes 'Ball 6' exists but 'Ball 7' doesn't; break is fine.
+            break
 
-        # find date column name (original form)
-        date_col = None
-        for orig, low in fld_map.items():
-            if 'drawdate' in low.replace(" ", "") or 'draw date' in low or low.strip() == 'draw' or 'date' == low or 'fecha' in low:
-                date_col = orig
-                break
-        # fallback to the first column if needed
-        if not date_col and fieldnames:
-            date_col = fieldnames[0]
-
-        # build ball column list in order by index: look for 'ball 1', 'ball 2', etc.
-        ball_cols = []
-        for n in range(1, 15):  # up to 14 just in case; will break when not found
-            pat1 = re.compile(r'\bball\s*%d\b' % n)
-            pat2 = re.compile(r'\bball%d\b' % n)
-            found = None
-            for orig, low in fld_map.items():
-                if pat1.search(low) or pat2.search(low):
-                    found = orig
-                    break
-            if found:
-                ball_cols.append(found)
-            else:
-                # stop scanning when a consecutive index missing (but still keep previously found)
-                # However, sometimes 'Ball 6' exists but 'Ball 7' doesn't; break is fine.
+    # identify explicit bonus-like columns (ordered)
+    bonus_tokens = ('bonus', 'thunderball', 'life ball', 'life_ball', 'lucky star', 'luckystar', 'powerball', 'extra')
+    bonus_cols = []
+    for orig, low in fld_map.items():
+        for tok in bonus_tokens:
+            if tok in low:
+                # avoid adding a column already captured in ball_cols
+                if orig not in ball_cols and orig != date_col:
+                    bonus_cols.append(orig)
                 break
 
-        # identify explicit bonus-like columns (ordered)
-        bonus_tokens = ('bonus', 'thunderball', 'life ball', 'life_ball', 'lucky star', 'luckystar', 'powerball', 'extra')
-        bonus_cols = []
-        for orig, low in fld_map.items():
-            for tok in bonus_tokens:
-                if tok in low:
-                    # avoid adding a column already captured in ball_cols
-                    if orig not in ball_cols and orig != date_col:
-                        bonus_cols.append(orig)
+    # For euromillions the API uses 'Lucky Star 1' and 'Lucky Star 2' — both will be collected by bonus_cols
+    # Iterate rows
+    spec = GAME_SPECS.get(page_id) if page_id else None
+    # rows are indexed positionally; column names resolve to cell indexes once
+    col_idx = _col_index(fieldnames)
+    date_i = col_idx[date_col]
+    ball_idx = [col_idx[col] for col in ball_cols]
+    bonus_idx = [col_idx[col] for col in bonus_cols]
+    for row in rows:
+        if not row:
+            continue
+        n_cells = len(row)
+        date_str = row[date_i].strip() if date_i < n_cells else ""
+        if not date_str:
+            # try to find any date-like field (rare: build the DictReader view)
+            for k, v in _row_dict(row, fieldnames).items():
+                if k and 'date' in (k or "").lower():
+                    date_str = (v or "").strip()
                     break
+        if not date_str:
+            continue
+        date_obj = try_parse_date_any(date_str, page_id=page_id)
+        if not date_obj:
+            continue
 
-        # For euromillions the API uses 'Lucky Star 1' and 'Lucky Star 2' — both will be collected by bonus_cols
-        # Iterate rows
-        f2 = io.StringIO(csv_text)
-        dr = csv.DictReader(f2, delimiter=delimiter)
-        for row in dr:
-            date_str = (row.get(date_col) or "").strip()
-            if not date_str:
-                # try to find any date-like field
-                for k in row.keys():
-                    if k and 'date' in (k or "").lower():
-                        date_str = (row.get(k) or "").strip()
-                        break
-            if not date_str:
+        mains = []
+        for i in ball_idx:
+            v = row[i].strip() if i < n_cells else ""
+            if not v:
                 continue
-            date_obj = try_parse_date_any(date_str)
-            if not date_obj:
+            n = _cell_ball(v)
+            if n is not None:
+                mains.append(n)
+
+        # collect bonus numbers from bonus_cols in header order
+        bonuses = []
+        for i in bonus_idx:
+            v = row[i].strip() if i < n_cells else ""
+            if not v:
                 continue
+            n = _cell_ball(v)
+            if n is not None:
+                bonuses.append(n)
 
-            mains = []
-            for col in ball_cols:
-                v = (row.get(col) or "").strip()
-                if not v:
-                    continue
-                m = ball_re.search(v)
-                if m:
-                    try:
-                        mains.append(int(m.group(1)))
-                    except Exception:
-                        pass
-
-            # collect bonus numbers from bonus_cols in header order
-            bonuses = []
-            for col in bonus_cols:
-                v = (row.get(col) or "").strip()
-                if not v:
-                    continue
-                m = ball_re.search(v)
-                if m:
-                    try:
-                        bonuses.append(int(m.group(1)))
-                    except Exception:
-                        pass
-
-            # If there are no explicit bonus_cols but there's a "Bonus Ball" labelled differently (e.g., 'Bonus Ball')
-            # it's already captured above via bonus_tokens, but keep fallback: detect fields named 'bonus' if any remain
-            # Enforce game ranges and split into mains/bonus according to GAME_SPECS if available
-            spec = GAME_SPECS.get(page_id) if page_id else None
-            if spec:
-                main_count = spec.get("main", len(mains))
-                # If mains length is smaller than expected, don't invent numbers; just trim/extend as possible
-                if len(mains) >= main_count:
-                    mains = mains[:main_count]
-                    # if we already captured extras in mains (e.g., Ball 6 for lotto), take bonuses from bonus_cols or remaining ball_cols
-                    if bonuses:
-                        bonus = bonuses
-                    else:
-                        bonus = []
-                else:
-                    # not enough mains: try to use bonus_cols to fill if they look numeric
-                    bonus = bonuses
-            else:
-                # no spec: heuristics
-                if len(mains) >= 6:
-                    mains = mains[:6]
-                    bonus = mains[6:] if len(mains) > 6 else bonuses
-                elif len(mains) == 5 and bonuses:
+        # If there are no explicit bonus_cols but there's a "Bonus Ball" labelled differently (e.g., 'Bonus Ball')
+        # it's already captured above via bonus_tokens, but keep fallback: detect fields named 'bonus' if any remain
+        # Enforce game ranges and split into mains/bonus according to GAME_SPECS if available
+        if spec:
+            main_count = spec.get("main", len(mains))
+            # If mains length is smaller than expected, don't invent numbers; just trim/extend as possible
+            if len(mains) >= main_count:
+                mains = mains[:main_count]
+                # if we already captured extras in mains (e.g., Ball 6 for lotto), take bonuses from bonus_cols or remaining ball_cols
+                if bonuses:
                     bonus = bonuses
                 else:
-                    # default: first 5 mains, rest bonuses
-                    bonus = bonuses
+                    bonus = []
+            else:
+                # not enough mains: try to use bonus_cols to fill if they look numeric
+                bonus = bonuses
+        else:
+            # no spec: heuristics
+            if len(mains) >= 6:
+                mains = mains[:6]
+                bonus = mains[6:] if len(mains) > 6 else bonuses
+            elif len(mains) == 5 and bonuses:
+                bonus = bonuses
+            else:
+                # default: first 5 mains, rest bonuses
+                bonus = bonuses
 
-            mains, bonus = _enforce_ranges(mains, bonus, page_id)
-            _normalize_and_append(draws, date_obj, mains, bonus, page_id=page_id)
+        _normalize_and_append(draws, date_obj, mains, bonus, limits=limits)
 
-        if draws:
-            return draws
-        # if we detected header style but parsed nothing, continue to other fallbacks below
-
-    # ----------------- EXISTING/ORIGINAL PATHS BELOW -----------------
-    # (Keep the rest of the original parse_csv_text implementation as-is)
-    # --- special-case explicit Winning Number columns (Australia-style CSVs) ---
-    f = io.StringIO(csv_text)
-    reader = csv.DictReader(f, delimiter=delimiter)
-    fieldnames = reader.fieldnames or []
+    return draws
+
+
+def _parse_winning_number_style(rows, page_id=None):
+    """
+    Explicit 'Winning Number N' / 'Powerball' columns (Australia-style CSVs).
+    """
+    rows = iter(rows)
+    fieldnames = next(rows, None) or []
     fn_lower = " ".join([(fn or "").lower() for fn in fieldnames])
+    if not (fieldnames and ("winning number" in fn_lower or "powerball" in fn_lower)):
+        return []
 
-    if fieldnames and ("winning number" in fn_lower or "powerball" in fn_lower):
-        f2 = io.StringIO(csv_text)
-        reader2 = csv.DictReader(f2, delimiter=delimiter)
-        for row in reader2:
-            date_str = None
-            for k in row:
-                if k and any(tok in (k or "").lower() for tok in ("date", "draw date", "fecha", "draw")):
-                    date_str = (row[k] or "").strip()
-                    break
-            if not date_str:
-                continue
-            date_obj = try_parse_date_any(date_str)
-            if not date_obj:
-                continue
+    # the header is static: resolve the date, Winning Number N and Powerball columns once
+    header_keys = [k for k in dict.fromkeys(fieldnames) if k]
+    date_col = next((k for k in header_keys
+                     if any(tok in k.lower() for tok in ("date", "draw date", "fecha", "draw"))), None)
+    if not date_col:
+        return []
+    win_cols = []
+    for k in header_keys:
+        m = _WINNUM_RE.match(k.lower())
+        if m:
+            try:
+                idx = int(m.group(1))
+            except Exception:
+                idx = 0
+            win_cols.append((idx, k))
+    win_cols.sort(key=lambda x: x[0])
+    win_cols = [col for _, col in win_cols]
+    pb_col = next((k for k in header_keys if 'powerball' in k.lower()), None)
+    col_idx = _col_index(fieldnames)
+    date_i = col_idx[date_col]
+    win_idx = [col_idx[col] for col in win_cols]
+    pb_i = col_idx[pb_col] if pb_col else None
 
-            mains = []
-            bonus = []
-            win_cols = []
-            for k in row.keys():
-                if not k:
-                    continue
-                kl = k.lower()
-                m = re.match(r'winning\s*number\s*(\d+)', kl)
-                if m:
-                    try:
-                        idx = int(m.group(1))
-                    except Exception:
-                        idx = 0
-                    win_cols.append((idx, k))
-            win_cols.sort(key=lambda x: x[0])
-            for idx, col in win_cols:
-                v = (row.get(col) or "").strip()
-                mnum = ball_re.search(v)
-                if mnum:
-                    try:
-                        mains.append(int(mnum.group(1)))
-                    except Exception:
-                        pass
+    draws = []
+    limits = _range_limits(page_id)
+    for row in rows:
+        if not row:
+            continue
+        n_cells = len(row)
+        date_str = row[date_i].strip() if date_i < n_cells else ""
+        if not date_str:
+            continue
+        date_obj = try_parse_date_any(date_str, page_id=page_id)
+        if not date_obj:
+            continue
 
-            pb_col = None
-            for k in row.keys():
-                if k and 'powerball' in k.lower():
-                    pb_col = k
-                    break
-            if pb_col:
-                v = (row.get(pb_col) or "").strip()
-                mnum = ball_re.search(v)
-                if mnum:
-                    try:
-                        bonus.append(int(mnum.group(1)))
-                    except Exception:
-                        pass
+        mains = []
+        bonus = []
+        for i in win_idx:
+            n = _cell_ball(row[i].strip()) if i < n_cells else None
+            if n is not None:
+                mains.append(n)
 
-            mains, bonus = _enforce_ranges(mains, bonus, page_id)
-            _normalize_and_append(draws, date_obj, mains, bonus, page_id=page_id)
+        if pb_i is not None:
+            n = _cell_ball(row[pb_i].strip()) if pb_i < n_cells else None
+            if n is not None:
+                bonus.append(n)
 
-        if draws:
-            return draws
+        _normalize_and_append(draws, date_obj, mains, bonus, limits=limits)
 
-    # --- Spanish-sheet or row-oriented (first col = date, rest numbers) ---
-    f_rows = io.StringIO(csv_text)
-    reader_rows = csv.reader(f_rows, delimiter=delimiter)
-    all_rows = [r for r in reader_rows if any((c or "").strip() for c in r)]
-    if all_rows:
-        header = all_rows[0]
-        header_lower = " ".join([(h or "").lower() for h in header])
-        if "fecha" in header_lower or "combin" in header_lower or (sum(1 for h in header if not h or h.strip() == "") > 2):
-            data_rows = all_rows[1:]
-            for row in data_rows:
-                if not row:
-                    continue
-                date_str = (row[0] or "").strip()
-                date_obj = try_parse_date_any(date_str)
-                if not date_obj:
-                    joined = " ".join(row)
-                    m = re.search(r'(\d{1,2}[\/\.\-]\d{1,2}[\/\.\-]\d{2,4})', joined)
-                    if m:
-                        date_obj = try_parse_date_any(m.group(1))
-                    if not date_obj:
-                        continue
-                tail = [c.strip() for c in row[1:] if c is not None and str(c).strip() != ""]
-                if tail and re.fullmatch(r'\d{6,}', tail[-1]):
-                    tail = tail[:-1]
-                nums = []
-                for v in tail:
-                    for mm in ball_re.findall(v):
-                        nums.append(int(mm))
-                mains = nums[:6] if len(nums) >= 6 else nums
-                bonus = nums[6:8] if len(nums) > 6 else []
-                mains, bonus = _enforce_ranges(mains, bonus, page_id)
-                _normalize_and_append(draws, date_obj, mains, bonus, page_id=page_id)
+    return draws
+
+
+def _parse_spanish_style(rows, page_id=None):
+    """
+    Spanish-sheet or row-oriented CSVs (first col = date, rest numbers).
+    """
+    # blank rows dropped lazily; the first remaining row is the header
+    data_rows = (r for r in rows if any((c or "").strip() for c in r))
+    header = next(data_rows, None)
+    if header is None:
+        return []
+    header_lower = " ".join([(h or "").lower() for h in header])
+    if not ("fecha" in header_lower or "combin" in header_lower or (sum(1 for h in header if not h or h.strip() == "") > 2)):
+        return []
+
+    draws = []
+    limits = _range_limits(page_id)
+    for row in data_rows:
+        if not row:
+            continue
+        date_str = (row[0] or "").strip()
+        date_obj = try_parse_date_any(date_str, page_id=page_id)
+        if not date_obj:
+            joined = " ".join(row)
+            m = _DATE_SEP_RE.search(joined)
+            if m:
+                date_obj = try_parse_date_any(m.group(1), page_id=page_id)
+            if not date_obj:
+                continue
+        tail = [c.strip() for c in row[1:] if c is not None and str(c).strip() != ""]
+        if tail and _LONG_DIGIT_RE.fullmatch(tail[-1]):
+            tail = tail[:-1]
+        # one scan per row: cells joined by spaces keep the same \b boundaries
+        nums = [int(mm) for mm in _BALL_RE.findall(" ".join(tail))]
+        mains = nums[:6] if len(nums) >= 6 else nums
+        bonus = nums[6:8] if len(nums) > 6 else []
+        _normalize_and_append(draws, date_obj, mains, bonus, limits=limits)
+
+    return draws
+
+
+@lru_cache(maxsize=256)
+def _game_spec_for(game):
+    """
+    GAME_SPECS entry whose key prefixes a normalized game label (e.g. 'megamillions'
+    from a Texas CSV row), or None. Labels repeat on every row, so this is memoized.
+    """
+    for k in GAME_SPECS:
+        if game.startswith(k):
+            return GAME_SPECS[k]
+    return None
 
-            if draws:
-                return draws
 
-    # --- headerless / tokenized fallback (space-separated etc.) ---
-    f3 = io.StringIO(csv_text)
-    reader3 = csv.reader(f3, delimiter=delimiter)
-    for raw_row in reader3:
+def _parse_headerless_style(rows, page_id=None):
+    """
+    Headerless / tokenized rows (space-separated etc.), e.g. Texas-style
+    'Game,M,D,YYYY,n1,...' lines.
+    """
+    draws = []
+    limits = _range_limits(page_id)
+    for raw_row in rows:
         if not raw_row:
             continue
         if len(raw_row) == 1:
-            tokens = re.split(r'\s+', raw_row[0].strip())
+            tokens = _WHITESPACE_RE.split(raw_row[0].strip())
         else:
             tokens = [c.strip() for c in raw_row if c is not None and str(c).strip() != ""]
         if not tokens:
@@ -650,7 +1057,7 @@ def parse_csv_text(csv_text, page_id=None):
 
         if date_idx is not None:
             game_raw = " ".join(tokens[:date_idx]).lower()
-            game = re.sub(r'[\s\-_]', '', game_raw)
+            game = _GAME_NAME_STRIP_RE.sub('', game_raw)
 
             try:
                 date_obj = datetime(year, month, day).date()
@@ -658,17 +1065,9 @@ def parse_csv_text(csv_text, page_id=None):
                 continue
 
             numeric_tail = tokens[date_idx+3:]
-            numbers = []
-            for n in numeric_tail:
-                for mm in ball_re.findall(str(n)):
-                    numbers.append(int(mm))
-
-            spec = None
-            for k in GAME_SPECS:
-                if game.startswith(k):
-                    spec = GAME_SPECS[k]
-                    break
+            numbers = [int(mm) for mm in _BALL_RE.findall(" ".join(map(str, numeric_tail)))]
 
+            spec = _game_spec_for(game)
             if spec:
                 main_count = spec.get("main", 5)
                 mains = numbers[:main_count]
@@ -683,14 +1082,13 @@ def parse_csv_text(csv_text, page_id=None):
                 else:
                     mains = numbers[:5]; bonus = numbers[5:]
 
-            mains, bonus = _enforce_ranges(mains, bonus, page_id)
-            _normalize_and_append(draws, date_obj, mains, bonus, page_id=page_id)
+            _normalize_and_append(draws, date_obj, mains, bonus, limits=limits)
             continue
 
         # last-resort: find a date snippet and extract last numeric tokens (strict 1-2 digit tokens)
         joined = " ".join(tokens)
         date_obj = None
-        m = re.search(r'(\d{1,2}[\/\.\-]\d{1,2}[\/\.\-]\d{2,4})', joined)
+        m = _DATE_SEP_RE.search(joined)
         if m:
             for fmt in ("%m/%d/%Y", "%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y"):
                 try:
@@ -710,38 +1108,171 @@ def parse_csv_text(csv_text, page_id=None):
                 date_obj = None
         if not date_obj:
             continue
-        nums = ball_re.findall(joined)
+        nums = _BALL_RE.findall(joined)
         if len(nums) >= 6:
             numbers = [int(x) for x in nums[-8:]]
             if len(numbers) >= 6:
                 mains = numbers[:5]
                 bonus = numbers[5:]
-                mains, bonus = _enforce_ranges(mains, bonus, page_id)
-                _normalize_and_append(draws, date_obj, mains, bonus, page_id=page_id)
+                _normalize_and_append(draws, date_obj, mains, bonus, limits=limits)
 
-    # final small dd.mm.YYYY style fallback (keeps your original behavior)
-    if not draws and lines and re.search(r'\d{1,2}\.\d{1,2}\.\d{4}', lines[0]):
-        for line in lines:
-            parts = re.split(r'[\t,; ]+', line.strip())
-            if len(parts) < 8:
-                continue
-            date_match = re.search(r'\d{1,2}\.\d{1,2}\.\d{4}', line)
-            if not date_match:
-                continue
-            date_str = date_match.group(0)
-            date_obj = try_parse_date_any(date_str)
-            if not date_obj:
-                continue
-            nums = [int(x) for x in parts if re.match(r'^\d+$', x)]
-            mains, bonus = nums[:6], nums[6:7]
-            mains, bonus = _enforce_ranges(mains, bonus, page_id)
-            _normalize_and_append(draws, date_obj, mains, bonus, page_id=page_id)
+    return draws
+
+
+def _parse_dotted_date_style(rows, delimiter, page_id=None):
+    """
+    Final small dd.mm.YYYY style fallback: 'drawno dd.mm.YYYY n1 ... n7' lines.
+    Each line is rebuilt from its tokenized row.
+    """
+    draws = []
+    limits = _range_limits(page_id)
+    for line in (delimiter.join(r) for r in rows):
+        parts = _FIELD_SPLIT_RE.split(line.strip())
+        if len(parts) < 8:
+            continue
+        date_match = _DATE_DOT_RE.search(line)
+        if not date_match:
+            continue
+        date_obj = _parse_dotted_date(date_match.group(0))
+        if not date_obj:
+            continue
+        # numbers follow the date; anything before it is the draw number
+        tail = _FIELD_SPLIT_RE.split(line[date_match.end():].strip())
+        nums = [int(x) for x in tail if _ALL_DIGITS_RE.match(x)]
+        mains, bonus = nums[:6], nums[6:7]
+        _normalize_and_append(draws, date_obj, mains, bonus, limits=limits)
 
     return draws
 
 
+# header-shape strategies tried in order by parse_csv_text; each returns [] when the
+# shape does not apply, and the first non-empty result wins
+_CSV_STRATEGIES = (
+    _parse_ball_header_style,
+    _parse_winning_number_style,
+    _parse_spanish_style,
+    _parse_headerless_style,
+)
+
 
-def scrape_lotteryguru_fortune_thursday(draw_cfg, days_back=DAYS_BACK):
+class _CsvRows:
+    """
+    csv.reader rows that every _CSV_STRATEGIES parser can walk in turn without
+    holding the whole CSV as a list. A str is re-read from itself on each pass;
+    a one-shot line stream is read lazily on the first pass and spilled to a
+    temp file as it goes, and any later pass (a strategy fallback) replays the spill.
+    """
+    def __init__(self, source, delimiter):
+        self._text = source if isinstance(source, str) else None
+        self._lines = None if self._text is not None else iter(source)
+        self._delimiter = delimiter
+        self._spill = None
+
+    def _spill_line(self, line):
+        self._spill.write(line.rstrip("\r\n") + "\n")
+
+    def _tee(self):
+        for line in self._lines:
+            self._spill_line(line)
+            yield line
+
+    def __iter__(self):
+        if self._text is not None:
+            return csv.reader(io.StringIO(self._text), delimiter=self._delimiter)
+        if self._spill is None:
+            self._spill = tempfile.TemporaryFile("w+", encoding="utf-8", newline="\n")
+            return csv.reader(self._tee(), delimiter=self._delimiter)
+        # an earlier pass may have stopped at the header: spill the unread rest, then replay
+        for line in self._lines:
+            self._spill_line(line)
+        self._spill.seek(0)
+        return csv.reader((line[:-1] for line in self._spill), delimiter=self._delimiter)
+
+    def close(self):
+        if self._spill is not None:
+            self._spill.close()
+
+
+def parse_csv_text(csv_text, page_id=None):
+    """
+    Robust CSV parser with added support for 'DrawDate,Ball 1,Ball 2,...' style headers
+    (National Lottery API CSV format). Keeps existing fallbacks for other CSV shapes.
+    csv_text is the whole CSV as a str, or any iterable of lines without line
+    endings (e.g. a streamed response's iter_lines(decode_unicode=True)); it is
+    tokenized lazily (see _CsvRows) and handed to each _CSV_STRATEGIES parser in turn.
+    Returns list of {"date": ISOdate, "main": [...], "bonus": [...]}
+    """
+    if not csv_text:
+        return []
+
+    if isinstance(csv_text, str):
+        csv_text = csv_text.lstrip('\ufeff\ufeff')
+        line_iter = io.StringIO(csv_text)
+    else:
+        line_iter = iter(csv_text)
+
+    # buffer only up to the first 40 non-blank lines (delimiter detection),
+    # then replay them in front of the rest of the stream
+    head = []
+
+    def _peek_nonblank(it):
+        for ln in it:
+            if not head:
+                ln = ln.lstrip('\ufeff')
+            head.append(ln)
+            if ln.strip():
+                yield ln.rstrip("\r\n")
+
+    first_40 = list(islice(_peek_nonblank(line_iter), 40))
+    sample = "\n".join(first_40)
+
+    # --- delimiter detection similar to before ---
+    first_line = first_40[0] if first_40 else ""
+    candidate_delims = [",", "\t", ";"]
+    chosen_delim = None
+    for delim in candidate_delims:
+        parts = [p.strip().lower() for p in first_line.split(delim)]
+        if any(("winning number" in p or "powerball" in p or "draw date" in p or "draw number" in p or p == "draw") for p in parts):
+            chosen_delim = delim
+            break
+    if not chosen_delim:
+        try:
+            sniffer = csv.Sniffer()
+            dialect = sniffer.sniff(sample)
+            chosen_delim = dialect.delimiter
+        except Exception:
+            chosen_delim = "\t" if "\t" in sample else ","
+
+    delimiter = chosen_delim
+
+    # every strategy walks the same rows (the first row is the header)
+    rows = _CsvRows(csv_text if isinstance(csv_text, str) else chain(head, line_iter), delimiter)
+    try:
+        for strategy in _CSV_STRATEGIES:
+            draws = strategy(rows, page_id=page_id)
+            if draws:
+                return draws
+
+        # (only the sniffing head was kept as text; the strategy rebuilds lines from rows)
+        if first_line and _DATE_DOT_RE.search(first_line):
+            return _parse_dotted_date_style(rows, delimiter, page_id=page_id)
+    finally:
+        rows.close()
+
+    return []
+
+
+
+# ------------ LotteryGuru XPaths (compiled once) ------------
+_XP_LG_LINES = etree.XPath(f"//div[{_xp_class('lg-line')}]")
+_XP_LG_DATES = etree.XPath(f".//div[{_xp_class('lg-date')}]")
+_XP_STRONG = etree.XPath(".//strong")
+_XP_LG_NUMBERS = etree.XPath(f".//ul[{_xp_class('lg-numbers-small')} and {_xp_class('game-number')}]")
+_XP_LG_NUMBER = etree.XPath(f".//li[{_xp_class('lg-number')}]")
+_XP_PAGE_INFO = etree.XPath("//*[@id='pageInfo']")
+
+
+def scrape_lotteryguru_fortune_thursday(draw_cfg, days_back=DAYS_BACK, log=print):
     """
     Robust LotteryGuru Fortune Thursday scraper with pagination.
     Returns list of {"date": ISOdate, "main": [...], "bonus": []}, newest-first.
@@ -750,159 +1281,192 @@ def scrape_lotteryguru_fortune_thursday(draw_cfg, days_back=DAYS_BACK):
     base_url = draw_cfg.get("html_url")
     if not base_url:
         return []
-    print(f"[debug] scrape_lotteryguru_fortune_thursday: base_url={base_url}")
+    log(f"[debug] scrape_lotteryguru_fortune_thursday: base_url={base_url}")
 
+    pid = draw_cfg.get("page_id")
     draws = []
-    session = requests.Session()
-    session.headers.update(HEADERS)
+    session = _SESSION
 
     # cutoff date (inclusive)
     cutoff = datetime.utcnow().date() - timedelta(days=days_back)
+    cutoff_ord = cutoff.toordinal()
 
-    # helper to parse a single page
+    # helper to parse a single page (lxml XPath, evaluated in libxml2; no bs4 tree)
     def parse_page(html):
         page_draws = []
-        soup = BeautifulSoup(html, "html.parser")
+        page_info = {}
+        root = _html_root(html)
+        if root is None:
+            return page_draws, page_info
 
         # every result block is a div with class lg-line
-        lines = soup.select("div.lg-line")
-        for line in lines:
+        for line in _XP_LG_LINES(root):
             # find the date: there are two .lg-date columns; the second has the actual date & year
-            date_nodes = line.select("div.lg-date")
+            date_nodes = _XP_LG_DATES(line)
             date_obj = None
-            if date_nodes:
-                # try second .lg-date (right aligned) with strong containing "02 Oct" and year after it
-                if len(date_nodes) >= 2:
-                    right = date_nodes[1]
-                    strong = right.find("strong")
-                    year_text = right.get_text(" ", strip=True)
-                    if strong:
-                        # build "02 Oct 2025" by combining strong + remaining text
-                        day_month = strong.get_text(" ", strip=True)
-                        # get text after the strong tag (usually the year)
-                        after = strong.next_sibling
-                        if after:
-                            # sometimes next_sibling is a newline/text containing year
-                            year = str(after).strip()
-                        else:
-                            # fallback: take right.text and remove the strong text
-                            year = year_text.replace(day_month, "").strip()
-                        candidate = f"{day_month} {year}".strip()
-                        date_obj = try_parse_date_any(candidate)
-                # fallback: try to find any date within the whole line
+            # try second .lg-date (right aligned) with strong containing "02 Oct" and year after it
+            if len(date_nodes) >= 2:
+                right = date_nodes[1]
+                strongs = _XP_STRONG(right)
+                if strongs:
+                    strong = strongs[0]
+                    # build "02 Oct 2025" by combining strong + remaining text
+                    day_month = _el_text(strong)
+                    # text after the strong tag (usually the year)
+                    if strong.tail:
+                        year = strong.tail.strip()
+                    else:
+                        # fallback: take right.text and remove the strong text
+                        year = _el_text(right).replace(day_month, "").strip()
+                    candidate = f"{day_month} {year}".strip()
+                    date_obj = try_parse_date_any(candidate, page_id=pid)
+            # fallback: try to find any date within the whole line
             if not date_obj:
-                txt = line.get_text(" ", strip=True)
-                m = re.search(r'(\d{1,2}\s+[A-Za-z]{3,9}\s+\d{4}|\d{1,2}[\/\.\-]\d{1,2}[\/\.\-]\d{2,4})', txt)
+                txt = _el_text(line)
+                m = _LG_DATE_RE.search(txt)
                 if m:
-                    date_obj = try_parse_date_any(m.group(1))
+                    date_obj = try_parse_date_any(m.group(1), page_id=pid)
 
             if not date_obj:
                 continue
 
             # get numbers from ul.lg-numbers-small.game-number > li.lg-number
             nums = []
-            ul = line.select_one("ul.lg-numbers-small.game-number")
-            if ul:
-                for li in ul.select("li.lg-number"):
-                    t = li.get_text(" ", strip=True)
-                    if re.search(r'\d', t):
-                        try:
-                            nums.append(int(re.search(r'\d{1,3}', t).group(0)))
-                        except Exception:
-                            pass
+            uls = _XP_LG_NUMBERS(line)
+            if uls:
+                for li in _XP_LG_NUMBER(uls[0]):
+                    mnum = _DIGITS_1_3_RE.search(_el_text(li))
+                    if mnum:
+                        nums.append(int(mnum.group(0)))
             else:
                 # fallback: collect all numeric tokens in the line and take last 5
-                found = [int(x) for x in re.findall(r'\d{1,3}', line.get_text(" ", strip=True))]
+                found = [int(x) for x in _DIGITS_1_3_RE.findall(_el_text(line))]
                 found = [n for n in found if n != date_obj.year]
                 nums = found[-5:] if len(found) >= 5 else found
 
             if len(nums) < 5:
                 continue
 
-            mains = nums[:5]
-            page_draws.append({"date": date_obj.isoformat(), "main": mains, "bonus": []})
+            # same 1.. floor _normalize_and_append applies for every other source
+            mains = [n for n in nums[:5] if n >= 1]
+            # _ord (date ordinal) is only used for the cutoff check and is stripped before returning
+            page_draws.append({"date": date_obj.isoformat(), "_ord": date_obj.toordinal(), "main": mains, "bonus": []})
 
         # also return pageInfo attributes for pagination control if present
-        page_info = {}
-        pi = soup.find(id="pageInfo")
-        if pi:
+        pis = _XP_PAGE_INFO(root)
+        if pis:
+            # HTML tree builders lowercase attribute names (lastPage -> lastpage)
+            attrs = {k.lower(): v for k, v in pis[0].attrib.items()}
             try:
-                page_info["pageNumber"] = int(pi.get("pageNumber", 1))
-                page_info["pageSize"] = int(pi.get("pageSize", 10))
-                page_info["lastPage"] = int(pi.get("lastPage", 1))
-                page_info["totalElementCount"] = int(pi.get("totalElementCount", 0))
+                page_info["pageNumber"] = int(attrs.get("pagenumber", 1))
+                page_info["pageSize"] = int(attrs.get("pagesize", 10))
+                page_info["lastPage"] = int(attrs.get("lastpage", 1))
+                page_info["totalElementCount"] = int(attrs.get("totalelementcount", 0))
             except Exception:
                 pass
 
         return page_draws, page_info
 
-    # first request to discover pagination meta
-    page = 1
-    last_page = None
-    while True:
+    def fetch_page(page):
         url = base_url if "?page=" in base_url else base_url.rstrip("/") + (f"?page={page}" if page > 1 else "")
-        try:
-            print(f"[debug] fetch page {page}: {url}")
-            r = session.get(url, timeout=REQUEST_TIMEOUT)
-            r.raise_for_status()
-            page_draws, page_info = parse_page(r.text)
-            print(f"[debug] page {page} parsed draws: {len(page_draws)}")
-            if page_info.get("lastPage"):
-                last_page = page_info["lastPage"]
-        except Exception as e:
-            print(f"[warning] fetch/parse failed for page {page}: {e}")
-            break
-
+        # request starts are spaced LOTTERYGURU_MIN_INTERVAL apart per host, across all worker threads
+        _throttle_host(url, LOTTERYGURU_MIN_INTERVAL)
+        log(f"[debug] fetch page {page}: {url}")
+        r = session.get(url, timeout=REQUEST_TIMEOUT)
+        r.raise_for_status()
+        return parse_page(r.text)
+
+    def take_page(page, page_draws):
+        """
+        Add a page's draws; returns True once the page reaches back past the cutoff.
+        """
+        log(f"[debug] page {page} parsed draws: {len(page_draws)}")
         draws.extend(page_draws)
+        if page_draws:
+            oldest_ord = min(d["_ord"] for d in page_draws)
+            if oldest_ord < cutoff_ord:
+                oldest_on_page = datetime.fromordinal(oldest_ord).date()
+                log(f"[debug] reached cutoff on page {page} (oldest_on_page={oldest_on_page} < cutoff={cutoff})")
+                return True
+        return False
 
-        oldest_on_page = None
-        try:
-            dates_on_page = [datetime.fromisoformat(d["date"]).date() for d in page_draws]
-            if dates_on_page:
-                oldest_on_page = min(dates_on_page)
-        except Exception:
-            oldest_on_page = None
-
-        if oldest_on_page and oldest_on_page < cutoff:
-            print(f"[debug] reached cutoff on page {page} (oldest_on_page={oldest_on_page} < cutoff={cutoff})")
-            break
-
-        page += 1
-        if last_page and page > last_page:
-            break
-        if page > 50:
-            print("[warning] reached page cap (50), stopping")
-            break
-        time.sleep(0.25)
+    # first request (sync) to discover pagination meta
+    try:
+        page_draws, page_info = fetch_page(1)
+    except Exception as e:
+        log(f"[warning] fetch/parse failed for page 1: {e}")
+        page_draws, page_info = None, {}
+    last_page = page_info.get("lastPage")
+
+    # an explicit ?page= URL always fetches the same page, so one request is enough
+    if page_draws is not None and not take_page(1, page_draws) and "?page=" not in base_url:
+        end_page = min(last_page or LOTTERYGURU_PAGE_CAP, LOTTERYGURU_PAGE_CAP)
+        # without lastPage we don't know where history ends, so walk it one page at a time
+        workers = LOTTERYGURU_WORKERS if last_page else 1
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+            futures = [(p, ex.submit(fetch_page, p)) for p in range(2, end_page + 1)]
+            # consume in page order so a failed or cutoff page ends history exactly as serial paging did
+            for p, fut in futures:
+                try:
+                    page_draws, _ = fut.result()
+                    stopped = take_page(p, page_draws)
+                except Exception as e:
+                    log(f"[warning] fetch/parse failed for page {p}: {e}")
+                    stopped = True
+                if stopped:
+                    for _, pending in futures:
+                        pending.cancel()
+                    break
+            else:
+                if not last_page or last_page > LOTTERYGURU_PAGE_CAP:
+                    log(f"[warning] reached page cap ({LOTTERYGURU_PAGE_CAP}), stopping")
 
-    # dedupe by date+numbers (sometimes duplicates across pages) and sort newest-first
+    # dedupe by date+numbers (sometimes duplicates across pages) and sort newest-first;
+    # parse_page always sets "bonus": [], so date + mains is the whole identity
     seen = set()
     deduped = []
     for d in draws:
-        key = (d["date"], tuple(d.get("main", [])), tuple(d.get("bonus", [])))
+        key = (d["date"], *d["main"])
         if key in seen:
             continue
         seen.add(key)
+        del d["_ord"]
         deduped.append(d)
 
     deduped.sort(key=lambda x: x["date"], reverse=True)
-    print(f"[debug] scrape_lotteryguru_fortune_thursday: total parsed draws after paging={len(deduped)}")
+    log(f"[debug] scrape_lotteryguru_fortune_thursday: total parsed draws after paging={len(deduped)}")
     return deduped
 
 
-def parse_sa_lotto_csv(csv_text):
+def parse_sa_lotto_csv(csv_text, log=print):
     """
     Robust parser for South Africa Lotto CSV (handles dd.mm.YYYY and other variants).
+    csv_text is the whole CSV as a str or any iterable of lines.
     Returns list of {"date": ISOdate, "main": [...], "bonus": [...]}
     """
     draws = []
     if not csv_text:
         return draws
 
-    lines = [ln for ln in csv_text.splitlines() if ln.strip()]
+    limits = _range_limits("sa_lotto")
+    lines = csv_text.splitlines() if isinstance(csv_text, str) else csv_text
     for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        # common shape: one regex pass yields the date and every number token
+        m_line = _SA_LINE_RE.fullmatch(line)
+        if m_line:
+            date_obj = _parse_dotted_date(m_line.group(1))
+            if date_obj:
+                # first 1-3 digits of each token, as the token loop below does
+                nums = list(map(int, _SA_NUM_RE.findall(m_line.group(2))))
+                if len(nums) >= 6:
+                    _normalize_and_append(draws, date_obj, nums[:6], nums[6:7], limits=limits)
+                continue
+
         # Split on tabs/commas/spaces; keep tokens
-        parts = re.split(r'[\t,]+|\s{2,}|\s+', line.strip())
+        parts = _ROW_SPLIT_RE.split(line)
         if len(parts) < 3:
             continue
 
@@ -910,23 +1474,16 @@ def parse_sa_lotto_csv(csv_text):
         date_obj = None
         if len(parts) > 1:
             p = parts[1].strip()
-            m_dot = re.match(r'^(\d{1,2})\.(\d{1,2})\.(\d{4})$', p)
-            if m_dot:
-                try:
-                    date_obj = datetime.strptime(p, "%d.%m.%Y").date()
-                except Exception:
-                    date_obj = None
+            if _DATE_DOT_FULL_RE.match(p):
+                date_obj = _parse_dotted_date(p)
             else:
-                date_obj = try_parse_date_any(p)
+                date_obj = try_parse_date_any(p, page_id="sa_lotto")
 
         # fallback: try to find a dd.mm.YYYY anywhere on the line
         if not date_obj:
-            m_any = re.search(r'(\d{1,2}\.\d{1,2}\.\d{4})', line)
+            m_any = _DATE_DOT_RE.search(line)
             if m_any:
-                try:
-                    date_obj = datetime.strptime(m_any.group(1), "%d.%m.%Y").date()
-                except Exception:
-                    date_obj = try_parse_date_any(m_any.group(1))
+                date_obj = _parse_dotted_date(m_any.group(1)) or try_parse_date_any(m_any.group(1), page_id="sa_lotto")
 
         if not date_obj:
             continue
@@ -936,10 +1493,14 @@ def parse_sa_lotto_csv(csv_text):
         for token in parts[2:]:
             if not token:
                 continue
-            m = re.search(r'(\d{1,3})', token)
+            # bare digit tokens: the regex below would just take the first 1-3 digits
+            if token.isdecimal():
+                nums.append(int(token[:3]))
+                continue
+            m = _DIGITS_1_3_RE.search(token)
             if m:
                 try:
-                    nums.append(int(m.group(1)))
+                    nums.append(int(m.group(0)))
                 except Exception:
                     pass
 
@@ -949,12 +1510,12 @@ def parse_sa_lotto_csv(csv_text):
         mains = nums[:6]
         bonus = nums[6:7] if len(nums) >= 7 else []
 
-        draws.append({"date": date_obj.isoformat(), "main": mains, "bonus": bonus})
+        _normalize_and_append(draws, date_obj, mains, bonus, limits=limits)
 
     if draws:
-        print(f"[debug] parse_sa_lotto_csv: parsed {len(draws)} rows, sample: {draws[:3]}")
+        log(f"[debug] parse_sa_lotto_csv: parsed {len(draws)} rows, sample: {draws[:3]}")
     else:
-        print("[debug] parse_sa_lotto_csv: parsed 0 rows (no valid lines)")
+        log("[debug] parse_sa_lotto_csv: parsed 0 rows (no valid lines)")
 
     return draws
 
@@ -968,7 +1529,30 @@ def _build_api_csv_url_for(draw_cfg):
     return None
 
 
-def fetch_csv(draw_cfg):
+def _keep_head(lines, head, n=8):
+    # pass streamed lines through to the parser, keeping the first n for the debug sample
+    for line in lines:
+        if len(head) < n:
+            head.append(line)
+        yield line
+
+
+def _peek_html(lines):
+    """
+    (is_html, lines): whether the first non-blank line opens an HTML document,
+    plus an iterator that still yields every line.
+    """
+    it = iter(lines)
+    head = []
+    for line in it:
+        head.append(line)
+        if line.strip():
+            break
+    is_html = bool(head) and _HTML_DOC_RE.match(head[-1]) is not None
+    return is_html, chain(head, it)
+
+
+def fetch_csv(draw_cfg, log=print):
     """
     Try a series of CSV url variants and return parsed draws or [].
     Improved to:
@@ -976,9 +1560,12 @@ def fetch_csv(draw_cfg):
     - Use a session that preloads the site to obtain cookies.
     - Use browser-like headers and retry on 403 with alternate headers.
     """
-    # create session and apply browser headers
+    # create session and apply browser headers (own cookies/headers per game,
+    # but connections come from the shared keep-alive pool)
     session = requests.Session()
     session.headers.update(BROWSER_HEADERS.copy())
+    session.mount("https://", _ADAPTER)
+    session.mount("http://", _ADAPTER)
 
     # preload homepage & draw page to establish cookies and typical referer flow
     try:
@@ -1030,108 +1617,171 @@ def fetch_csv(draw_cfg):
         last_exc = None
         for attempt in range(1, CSV_FETCH_RETRIES + 1):
             try:
-                print(f"[debug] Attempting CSV URL: {u} (attempt {attempt})")
+                log(f"[debug] Attempting CSV URL: {u} (attempt {attempt})")
                 # set referer to the game's html page if present
                 hdrs = session.headers.copy()
                 if html:
                     hdrs["Referer"] = html
                 # sometimes APIs like a specific Accept header
                 hdrs["Accept"] = "text/csv, text/plain, */*; q=0.01"
+                hdrs.update(_conditional_headers(u))
+
+                with session.get(u, headers=hdrs, timeout=REQUEST_TIMEOUT, allow_redirects=True,
+                                 stream=True) as r:
+                    # if we get a 403, try again with an X-Requested-With and slightly different headers
+                    if r.status_code == 403 and attempt < CSV_FETCH_RETRIES:
+                        log(f"[warning] 403 received for {u} — retrying with AJAX-like headers")
+                        session.headers.update({
+                            "X-Requested-With": "XMLHttpRequest",
+                            "Sec-Fetch-Mode": "cors",
+                            "Sec-Fetch-Site": "same-origin"
+                        })
+                        time.sleep(CSV_FETCH_BACKOFF * attempt)
+                        continue
 
-                r = session.get(u, headers=hdrs, timeout=REQUEST_TIMEOUT, allow_redirects=True)
-                # if we get a 403, try again with an X-Requested-With and slightly different headers
-                if r.status_code == 403 and attempt < CSV_FETCH_RETRIES:
-                    print(f"[warning] 403 received for {u} — retrying with AJAX-like headers")
-                    session.headers.update({
-                        "X-Requested-With": "XMLHttpRequest",
-                        "Sec-Fetch-Mode": "cors",
-                        "Sec-Fetch-Site": "same-origin"
-                    })
-                    time.sleep(CSV_FETCH_BACKOFF * attempt)
-                    continue
+                    if r.status_code == 304:
+                        log(f"[debug] CSV not modified, using cached body: {u}")
+                        lines = _iter_http_cache_lines(u)
+                    else:
+                        r.raise_for_status()
+                        # decode and split the body as it streams in, so the parser
+                        # never sees a whole-body bytes/str/StringIO copy; the cache
+                        # copy is written to disk line by line as the parser reads
+                        r.encoding = r.encoding or "utf-8"
+                        lines = _tee_http_cache(u, r, r.iter_lines(decode_unicode=True), log=log)
+                    head = []
+                    lines = _keep_head(lines, head)
+
+                    # an HTML page never parses to draws: skip the variant unread
+                    # (and uncached) instead of running the parsers over it
+                    is_html, lines = _peek_html(lines)
+                    if is_html:
+                        log(f"[debug] CSV URL {u} returned an HTML page, skipping")
+                        break
 
-                r.raise_for_status()
-                # decode content robustly
-                enc = r.encoding or getattr(r, "apparent_encoding", None) or "utf-8"
-                try:
-                    txt = r.content.decode(enc, errors="replace")
-                except Exception:
-                    txt = r.content.decode("ISO-8859-1", errors="replace")
+                    # parse
+                    pid = draw_cfg.get("page_id")
+                    csv_parser = CSV_PARSERS.get(pid)
+                    if csv_parser:
+                        draws = csv_parser(lines, log=log)
+                        log(f"[debug] fetch_csv: {pid} parsed {len(draws)} rows from {u}")
+                    else:
+                        draws = parse_csv_text(lines, page_id=pid)
 
-                # parse
-                if draw_cfg.get("page_id") == "sa_lotto":
-                    draws = parse_sa_lotto_csv(txt)
-                    print(f"[debug] fetch_csv: sa_lotto parsed {len(draws)} rows from {u}")
-                else:
-                    draws = parse_csv_text(txt, page_id=draw_cfg.get("page_id"))
+                    if r.status_code != 304:
+                        # a parser may stop before the end: finish the stream so
+                        # the cached body is complete
+                        for _ in lines:
+                            pass
 
                 if draws:
-                    print(f"[debug] CSV parsed OK from {u} (rows: {len(draws)})")
+                    log(f"[debug] CSV parsed OK from {u} (rows: {len(draws)})")
                     return draws
                 else:
-                    sample = txt.splitlines()[:8]
-                    print(f"[debug] CSV from {u} parsed 0 draws; sample:\n" + "\n".join(sample))
+                    log(f"[debug] CSV from {u} parsed 0 draws; sample:\n" + "\n".join(head))
                     # if parsed 0, maybe it's an HTML error page; continue to next variant
                     break
             except requests.HTTPError as he:
                 last_exc = he
-                print(f"[warning] HTTP error fetching CSV {u}: {he}")
+                log(f"[warning] HTTP error fetching CSV {u}: {he}")
+                # a dead variant (404, 410, ...) won't come back on retry: move to the next URL
+                status = he.response.status_code if he.response is not None else None
+                if status in _DEAD_URL_STATUSES:
+                    break
                 # if 403, try to adjust headers and retry in the next attempt
                 time.sleep(CSV_FETCH_BACKOFF * attempt)
                 continue
             except Exception as e:
                 last_exc = e
-                print(f"[warning] CSV fetch failed for {u}: {e}")
+                log(f"[warning] CSV fetch failed for {u}: {e}")
                 time.sleep(CSV_FETCH_BACKOFF * attempt)
                 continue
         # if we exhausted attempts for this URL, continue to next variant
         if last_exc:
-            print(f"[debug] exhausted attempts for {u}: last_exc={last_exc}")
+            log(f"[debug] exhausted attempts for {u}: last_exc={last_exc}")
 
     return []
 
 
 def filter_recent(draws, days_back):
     cutoff = datetime.utcnow().date() - timedelta(days=days_back)
-    return [d for d in draws if datetime.fromisoformat(d["date"]).date() >= cutoff]
+    # draw dates are date.isoformat() strings (zero-padded YYYY-MM-DD), which
+    # order exactly like the dates, so compare them as strings without re-parsing
+    cutoff_iso = cutoff.isoformat()
+    return [d for d in draws if d["date"] >= cutoff_iso]
+
+
+def _iter_balls(draws, field):
+    """
+    Flat iterator over the ball lists stored under draws[i][field].
+    Every parser stores lists of ints >= 1 (see _normalize_and_append), so no
+    per-number checks are needed here.
+    """
+    return chain.from_iterable(d.get(field) or () for d in draws)
+
+
+def tally_hot(numbers, max_ball):
+    """
+    bincount-style tally for a bounded ball space: returns (counts, first), two
+    lists indexed by ball number where counts[n] is how often ball n appears and
+    first[n] ranks when n was first seen. Numbers outside 1..max_ball are ignored.
+    """
+    # Counter's counting loop runs in C and keeps keys in first-seen order; one
+    # pass over the distinct values fills the slots and drops out-of-range balls
+    counts = [0] * (max_ball + 1)
+    first = [0] * (max_ball + 1)
+    for i, (n, c) in enumerate(Counter(numbers).items()):
+        if 1 <= n <= max_ball:
+            counts[n] = c
+            first[n] = i
+    return counts, first
+
+
+def _top_counts(counts, first, top_n):
+    """
+    Top-N (number, count) pairs from tally_hot lists, highest count first.
+    Equal counts keep the order the balls were first seen in draws, as
+    Counter.most_common does.
+    """
+    # partial selection (no full sort of the ball space), ordered by (-count, first_seen)
+    ranked = heapq.nlargest(top_n, (n for n in range(1, len(counts)) if counts[n]),
+                            key=lambda n: (counts[n], -first[n]))
+    return [(n, counts[n]) for n in ranked]
 
 
 def compute_hot(draws, top_main_n=10, top_bonus_n=10, page_id=None):
     """
     Count mains & bonuses and return two lists sized by top_main_n / top_bonus_n.
+    Games with GAME_RANGES are tallied into fixed-size lists; others use Counter.
     """
-    mc = Counter()
-    bc = Counter()
     ranges = GAME_RANGES.get(page_id) or {}
     main_max = ranges.get("main_max")
     bonus_max = ranges.get("bonus_max")
-    for d in draws:
-        mains = d.get("main", []) or []
-        if isinstance(mains, int):
-            mains = [mains]
-        mains = [int(n) for n in mains if isinstance(n, int) and n >= 1]
-        if main_max is not None:
-            mains = [n for n in mains if n <= main_max]
-
-        bonus = d.get("bonus", []) or []
-        if isinstance(bonus, int):
-            bonus = [bonus]
-        bonus = [int(n) for n in bonus if isinstance(n, int) and n >= 1]
-        if bonus_max is not None:
-            bonus = [n for n in bonus if n <= bonus_max]
-
-        mc.update(mains)
-        bc.update(bonus)
-
+    if main_max is not None and bonus_max is not None:
+        main_counts, main_first = tally_hot(_iter_balls(draws, "main"), main_max)
+        bonus_counts, bonus_first = tally_hot(_iter_balls(draws, "bonus"), bonus_max)
+        return (_top_counts(main_counts, main_first, top_main_n),
+                _top_counts(bonus_counts, bonus_first, top_bonus_n))
+    # one flat pass per field straight into Counter (C-level counting loop);
+    # out-of-range balls are dropped per distinct value, not per number
+    mc = Counter(_iter_balls(draws, "main"))
+    bc = Counter(_iter_balls(draws, "bonus"))
+    for counts, cap in ((mc, main_max), (bc, bonus_max)):
+        if cap is None:
+            cap = float("inf")
+        for n in [n for n in counts if not 1 <= n <= cap]:
+            del counts[n]
     return mc.most_common(top_main_n), bc.most_common(top_bonus_n)
 
 
+@lru_cache(maxsize=1)
 def init_firestore():
     """
     Initialization logic:
     - If environment variable FIREBASE_SERVICE_ACCOUNT contains the full JSON,
       use that.
     - Otherwise Fall back to GOOGLE_APPLICATION_CREDENTIALS path.
+    The client is cached: later calls reuse it without re-reading credentials.
     """
     try:
         if firebase_admin._apps:
@@ -1158,85 +1808,137 @@ def init_firestore():
     return firestore.client()
 
 
-def save_to_firestore(db, key, out):
+def save_batch_to_firestore(db, results, retries=3):
+    """
+    Write every {key: out} in results to lotteries/<key> using WriteBatch
+    commits (one RPC per FIRESTORE_BATCH_LIMIT docs instead of one per key).
+    A commit that fails with Aborted (contention) or DeadlineExceeded is rebuilt
+    and retried with exponential backoff (batch.set is idempotent).
+    """
     col = db.collection("lotteries")
-    doc = col.document(key)
-    doc.set(out)
+    items = list(results.items())
+    for i in range(0, len(items), FIRESTORE_BATCH_LIMIT):
+        chunk = items[i:i + FIRESTORE_BATCH_LIMIT]
+        for attempt in range(1, retries + 1):
+            batch = db.batch()
+            for key, out in chunk:
+                batch.set(col.document(key), out)
+            try:
+                batch.commit()
+                break
+            except (Aborted, DeadlineExceeded) as e:
+                if attempt == retries:
+                    raise
+                print(f"[warning] Firestore batch commit failed (attempt {attempt}): {e}")
+                time.sleep(FIRESTORE_BACKOFF * 2 ** (attempt - 1))
 
 
 # ------------ Main run ------------
+# page_id -> game-specific parser/scraper; anything missing uses the generic one
+CSV_PARSERS = {
+    "sa_lotto": parse_sa_lotto_csv,
+}
+
+HTML_SCRAPERS = {
+    "ghana_fortune_thursday": ("LotteryGuru", scrape_lotteryguru_fortune_thursday),
+}
+
+
+def process_lottery(key, cfg, log=print):
+    """
+    Fetch, parse and rank one lottery. Returns the output dict for key.
+    Runs in a worker thread from run_and_save (network-bound, no shared state);
+    progress lines go to log, which the fetchers/parsers it calls share.
+    """
+    log(f"\n== Processing {key} ==")
+    draws = []
+    # prefer CSV when available (more stable than HTML scraping)
+    try:
+        draws = fetch_csv(cfg, log=log)
+        if draws:
+            log(f"[debug] parsed draws from CSV: {len(draws)}")
+    except Exception as e:
+        log(f"[warning] CSV fetch/parse failed for {key}: {e}")
+        draws = []
+
+    # fallback to HTML scraping if CSV empty or not available
+    if not draws:
+        log("[debug] No draws found by CSV, trying HTML scraping.")
+        source, scraper = HTML_SCRAPERS.get(cfg.get("page_id"), ("HTML", scrape_html))
+        draws = scraper(cfg, log=log)
+        log(f"[debug] parsed draws from {source}: {len(draws)}")
+
+    recent = filter_recent(draws, DAYS_BACK)
+    log(f"[debug] recent draws (last {DAYS_BACK} days): {len(recent)}")
+
+    cfg_hot = HOT_TOP_N.get(key, {})
+    top_main_n = cfg_hot.get("top_main", 10)
+    top_bonus_n = cfg_hot.get("top_bonus", 10)
+
+    top_main, top_bonus = compute_hot(recent,
+                                      top_main_n=top_main_n,
+                                      top_bonus_n=top_bonus_n,
+                                      page_id=key)
+
+    return {
+        "fetched_at": datetime.utcnow().isoformat() + "Z",
+        "draws_total": len(draws),
+        "draws_recent": len(recent),
+        "top_main": [{"number": n, "count": c} for n, c in top_main],
+        "top_bonus": [{"number": n, "count": c} for n, c in top_bonus],
+    }
+
+
 def run_and_save():
+    results = {}
+    # lotteries are independent and I/O-bound: fetch/parse them concurrently,
+    # then write local files from this thread as each one completes.
+    # Firestore init (credential load + client setup) runs on its own thread
+    # alongside the fetches; it is only needed for the final write.
+    # each worker logs into its own lottery's list; the block is printed from this
+    # thread when the lottery completes, so concurrent lotteries never interleave
+    logs = {key: [] for key in LOTTERIES}
+    with ThreadPoolExecutor(max_workers=1) as init_ex, \
+            ThreadPoolExecutor(max_workers=max(1, min(MAX_WORKERS, len(LOTTERIES)))) as ex:
+        db_future = init_ex.submit(init_firestore)
+        futures = {ex.submit(process_lottery, key, cfg, logs[key].append): key
+                   for key, cfg in LOTTERIES.items()}
+        for fut in as_completed(futures):
+            key = futures[fut]
+            print("\n".join(logs.pop(key)))
+            try:
+                out = fut.result()
+                results[key] = out
+
+                # local JSON save
+                fname = f"{key}_hot.json"
+                # encode in one go and write once (json.dump streams many small writes)
+                payload = json.dumps(out, indent=2)
+                with open(fname, "w", encoding="utf-8") as f:
+                    f.write(payload)
+                print(f"[debug] Saved {fname}")
+
+            except Exception as e:
+                print(f"[error] {key} failed: {e}")
+
     db = None
     try:
-        db = init_firestore()
+        db = db_future.result()
         print("[info] Firestore client initialized.")
     except Exception as e:
         print("[warning] Could not initialize Firestore:", e)
         db = None
 
-    results = {}
-    for key, cfg in LOTTERIES.items():
-        print(f"\n== Processing {key} ==")
-        draws = []
+    # save to Firestore if available: all lotteries in one batched commit
+    if db is not None and results:
         try:
-            # prefer CSV when available (more stable than HTML scraping)
-            try:
-                draws = fetch_csv(cfg)
-                if draws:
-                    print(f"[debug] parsed draws from CSV: {len(draws)}")
-            except Exception as e:
-                print(f"[warning] CSV fetch/parse failed for {key}: {e}")
-                draws = []
-
-            # fallback to HTML scraping if CSV empty or not available
-            if not draws:
-                print("[debug] No draws found by CSV, trying HTML scraping.")
-                if cfg.get("page_id") == "ghana_fortune_thursday":
-                    draws = scrape_lotteryguru_fortune_thursday(cfg)
-                    print(f"[debug] parsed draws from LotteryGuru: {len(draws)}")
-                else:
-                    draws = scrape_html(cfg)
-                    print(f"[debug] parsed draws from HTML: {len(draws)}")
-
-            recent = filter_recent(draws, DAYS_BACK)
-            print(f"[debug] recent draws (last {DAYS_BACK} days): {len(recent)}")
-
-            cfg_hot = HOT_TOP_N.get(key, {})
-            top_main_n = cfg_hot.get("top_main", 10)
-            top_bonus_n = cfg_hot.get("top_bonus", 10)
-
-            top_main, top_bonus = compute_hot(recent,
-                                              top_main_n=top_main_n,
-                                              top_bonus_n=top_bonus_n,
-                                              page_id=key)
-
-            out = {
-                "fetched_at": datetime.utcnow().isoformat() + "Z",
-                "draws_total": len(draws),
-                "draws_recent": len(recent),
-                "top_main": [{"number": n, "count": c} for n, c in top_main],
-                "top_bonus": [{"number": n, "count": c} for n, c in top_bonus],
-            }
-            results[key] = out
-
-            # local JSON save
-            fname = f"{key}_hot.json"
-            with open(fname, "w", encoding="utf-8") as f:
-                json.dump(out, f, indent=2)
-            print(f"[debug] Saved {fname}")
-
-            # save to Firestore if available
-            if db is not None:
-                try:
-                    save_to_firestore(db, key, out)
-                    print(f"[info] Written {key} => Firestore/lotteries/{key}")
-                except Exception as e:
-                    print(f"[warning] Firestore write failed for {key}: {e}")
-
+            save_batch_to_firestore(db, results)
+            print(f"[info] Written {len(results)} docs => Firestore/lotteries ({', '.join(results)})")
         except Exception as e:
-            print(f"[error] {key} failed: {e}")
+            print(f"[warning] Firestore batch write failed: {e}")
 
-    return results
+    # keep LOTTERIES order in the returned mapping
+    return {key: results[key] for key in LOTTERIES if key in results}
 
 
 if __name__ == "__main__":